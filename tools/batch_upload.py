@@ -7,15 +7,26 @@ Deletes original files after successful upload.
 """
 
 import argparse
+import gzip
+import hashlib
+import itertools
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
 
 import boto3
 from botocore.exceptions import ClientError
 
+try:
+    import orjson  # Rust codec: bytes-native and several times faster
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 # Configuration
 AWS_PROFILE = os.environ.get('AWS_PROFILE', 'default')
 TRACKS_BUCKET = os.environ.get('TRACKS_BUCKET', '')
@@ -23,10 +34,19 @@ METADATA_FILE = 'metadata_base.json'
 MANIFEST_FILE = 'manifest.json'
 
 
+def _utc_now_z() -> str:
+    """UTC timestamp ending in Z; strftime skips the '+00:00' replace pass."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
 def get_s3_client():
     """Get boto3 S3 client with personal profile."""
+    from botocore.config import Config
+
     session = boto3.Session(profile_name=AWS_PROFILE)
-    return session.client('s3')
+    # Pool sized above the worker count so concurrent uploads never queue
+    # on the HTTP connection pool.
+    return session.client('s3', config=Config(max_pool_connections=32))
 
 
 def upload_file(s3_client, local_path: Path, s3_key: str, content_type: str = None) -> bool:
@@ -59,54 +79,122 @@ def get_content_type(filepath: Path) -> str:
     return types.get(ext, 'application/octet-stream')
 
 
+def list_existing_etags(s3_client, prefix: str) -> dict:
+    """Map existing S3 keys under a prefix to their ETags (plain MD5 for
+    single-part uploads, which covers artwork-sized objects)."""
+    existing = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=TRACKS_BUCKET, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            existing[obj['Key']] = obj['ETag'].strip('"')
+    return existing
+
+
+def upload_track(s3_client, file_path: str, track: dict, skip_artwork: bool,
+                 existing_artwork: dict) -> dict:
+    """Upload one track's audio (and artwork) to S3. Runs on a worker thread.
+
+    Pure network I/O against distinct keys; all metadata mutation happens
+    on the consuming thread in main().
+    """
+    original_path = Path(file_path)
+    track_id = track['id']
+    result = {'status': 'uploaded', 's3_path': None, 's3_artwork_path': None}
+
+    if not original_path.exists():
+        result['status'] = 'missing'
+        return result
+
+    s3_audio_key = f"audio/{track_id}.mp3"
+    if not upload_file(s3_client, original_path, s3_audio_key, get_content_type(original_path)):
+        result['status'] = 'failed'
+        return result
+    result['s3_path'] = s3_audio_key
+
+    if not skip_artwork and track.get('artwork_path'):
+        artwork_path = Path(track['artwork_path'])
+        if artwork_path.exists():
+            s3_artwork_key = f"artwork/{artwork_path.name}"
+            local_md5 = hashlib.md5(artwork_path.read_bytes()).hexdigest()
+            if existing_artwork.get(s3_artwork_key) == local_md5:
+                # Identical object already in S3; just record the key
+                result['s3_artwork_path'] = s3_artwork_key
+            elif upload_file(s3_client, artwork_path, s3_artwork_key, get_content_type(artwork_path)):
+                result['s3_artwork_path'] = s3_artwork_key
+
+    return result
+
+
 def load_metadata(metadata_dir: Path) -> dict:
     """Load metadata_base.json."""
     metadata_file = metadata_dir / METADATA_FILE
-    with open(metadata_file) as f:
-        return json.load(f)
+    return _json_loads(metadata_file.read_bytes())
 
 
-def save_metadata(metadata_dir: Path, metadata: dict):
-    """Save metadata_base.json."""
+def save_metadata(metadata_dir: Path, metadata: dict, pretty: bool = False):
+    """Save metadata_base.json (compact by default; pretty for final saves).
+
+    Writes via a temp file + os.replace so a crash mid-checkpoint can never
+    corrupt the previous file.
+    """
     metadata_file = metadata_dir / METADATA_FILE
-    with open(metadata_file, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    tmp = metadata_file.with_suffix('.json.tmp')
+    with open(tmp, 'w') as f:
+        if pretty:
+            json.dump(metadata, f, indent=2)
+        else:
+            json.dump(metadata, f, separators=(',', ':'))
+    os.replace(tmp, metadata_file)
+
+
+# Manifest fields copied verbatim from each uploaded track, in output order;
+# id/path/artwork/tagged need defaults or renames and are handled separately.
+_MANIFEST_KEYS = ('artist', 'album', 'title', 'year', 'duration')
+
+
+def _manifest_entry(track: dict) -> dict:
+    entry = {'id': track['id'], 'path': track['s3_path']}
+    for key in _MANIFEST_KEYS:
+        entry[key] = track.get(key)
+    entry['artwork'] = track.get('s3_artwork_path')
+    entry['tagged'] = track.get('tagged', False)
+    return entry
 
 
 def build_manifest(metadata: dict) -> dict:
     """Build manifest.json from metadata_base."""
-    tracks = []
-    for file_path, track in metadata['tracks'].items():
-        if not track.get('uploaded'):
-            continue
-
-        tracks.append({
-            'id': track['id'],
-            'path': track['s3_path'],
-            'artist': track.get('artist'),
-            'album': track.get('album'),
-            'title': track.get('title'),
-            'year': track.get('year'),
-            'duration': track.get('duration'),
-            'artwork': track.get('s3_artwork_path'),
-            'tagged': track.get('tagged', False)
-        })
-
     return {
         'version': 1,
-        'generated': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-        'tracks': tracks
+        'generated': _utc_now_z(),
+        'tracks': [
+            _manifest_entry(track)
+            for track in metadata['tracks'].values()
+            if track.get('uploaded')
+        ]
     }
 
 
 def upload_manifest(s3_client, manifest: dict) -> bool:
     """Upload manifest.json to S3."""
+    # Serialize straight to bytes so botocore signs and sends the buffer
+    # as-is instead of re-encoding a str body.
+    if orjson is not None:
+        payload = orjson.dumps(manifest, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(manifest, indent=2).encode('utf-8')
+
+    # Store gzipped with ContentEncoding set: CloudFront/S3 serve the header
+    # through and browsers decompress transparently, so the manifest costs
+    # ~30% of its JSON size on every PUT here and GET in the player.
+    body = gzip.compress(payload, compresslevel=6)
+
     try:
         s3_client.put_object(
             Bucket=TRACKS_BUCKET,
             Key=MANIFEST_FILE,
-            Body=json.dumps(manifest, indent=2),
-            ContentType='application/json'
+            Body=body,
+            ContentType='application/json',
+            ContentEncoding='gzip'
         )
         return True
     except ClientError as e:
@@ -140,11 +228,23 @@ def main():
         default=0,
         help='Limit number of tracks to upload (0 = unlimited)'
     )
+    parser.add_argument(
+        '--start',
+        type=int,
+        default=0,
+        help='Skip the first N unuploaded tracks (default: 0)'
+    )
     parser.add_argument(
         '--skip-artwork',
         action='store_true',
         help='Skip uploading artwork files'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=16,
+        help='Concurrent upload workers (default: 16)'
+    )
 
     args = parser.parse_args()
 
@@ -159,9 +259,12 @@ def main():
     to_upload = {k: v for k, v in metadata['tracks'].items() if not v.get('uploaded')}
     print(f"Tracks to upload: {len(to_upload)}")
 
-    if args.limit > 0:
-        to_upload = dict(list(to_upload.items())[:args.limit])
-        print(f"Limited to {len(to_upload)} tracks")
+    if args.start > 0 or args.limit > 0:
+        # islice slices the items view lazily instead of materializing the
+        # whole dict as a list of tuples first
+        stop = args.start + args.limit if args.limit > 0 else None
+        to_upload = dict(itertools.islice(to_upload.items(), args.start, stop))
+        print(f"Limited to {len(to_upload)} tracks (offset {args.start})")
 
     if len(to_upload) == 0:
         print("Nothing to upload!")
@@ -180,66 +283,74 @@ def main():
     print("\nInitializing S3 client...")
     s3_client = get_s3_client()
 
-    # Upload tracks
+    # One LIST up front makes artwork re-uploads idempotent: unchanged
+    # files are skipped by ETag instead of re-PUT on every run.
+    existing_artwork = {}
+    if not args.skip_artwork:
+        existing_artwork = list_existing_etags(s3_client, 'artwork/')
+        print(f"Found {len(existing_artwork)} existing artwork object(s) in S3")
+
+    # Upload tracks. Each job is network I/O against distinct keys, so a
+    # thread pool parallelizes cleanly; metadata mutation, deletes and
+    # checkpoints all stay on this thread via as_completed.
     uploaded = 0
     failed = 0
     deleted = 0
-
-    artwork_dir = args.metadata_dir / 'artwork'
-
-    for i, (file_path, track) in enumerate(to_upload.items(), 1):
-        original_path = Path(file_path)
-        track_id = track['id']
-
-        print(f"[{i}/{len(to_upload)}] {track['original_filename'][:60]}...")
-
-        # Upload audio file
-        s3_audio_key = f"audio/{track_id}.mp3"
-
-        if not original_path.exists():
-            print(f"  SKIP: Original file not found")
-            failed += 1
-            continue
-
-        if not upload_file(s3_client, original_path, s3_audio_key, get_content_type(original_path)):
-            failed += 1
-            continue
-
-        # Update metadata with S3 path
-        metadata['tracks'][file_path]['s3_path'] = s3_audio_key
-        metadata['tracks'][file_path]['uploaded'] = True
-
-        # Upload artwork if exists
-        if not args.skip_artwork and track.get('artwork_path'):
-            artwork_path = Path(track['artwork_path'])
-            if artwork_path.exists():
-                s3_artwork_key = f"artwork/{artwork_path.name}"
-                if upload_file(s3_client, artwork_path, s3_artwork_key, get_content_type(artwork_path)):
-                    metadata['tracks'][file_path]['s3_artwork_path'] = s3_artwork_key
-
-        uploaded += 1
-
-        # Delete original file
-        if not args.no_delete:
-            try:
-                original_path.unlink()
-                deleted += 1
-                print(f"  Uploaded and deleted")
-            except OSError as e:
-                print(f"  Uploaded (delete failed: {e})")
-        else:
-            print(f"  Uploaded")
-
-        # Save checkpoint every 50 tracks
-        if uploaded % 50 == 0:
-            print(f"  Checkpoint: saving metadata and manifest...")
-            save_metadata(args.metadata_dir, metadata)
-            manifest = build_manifest(metadata)
-            upload_manifest(s3_client, manifest)
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(upload_track, s3_client, file_path, track, args.skip_artwork, existing_artwork): file_path
+            for file_path, track in to_upload.items()
+        }
+
+        for future in as_completed(futures):
+            file_path = futures[future]
+            track = to_upload[file_path]
+            done += 1
+
+            print(f"[{done}/{len(to_upload)}] {track['original_filename'][:60]}...")
+
+            result = future.result()
+
+            if result['status'] == 'missing':
+                print(f"  SKIP: Original file not found")
+                failed += 1
+                continue
+
+            if result['status'] == 'failed':
+                failed += 1
+                continue
+
+            # Update metadata with S3 paths
+            metadata['tracks'][file_path]['s3_path'] = result['s3_path']
+            metadata['tracks'][file_path]['uploaded'] = True
+            if result['s3_artwork_path']:
+                metadata['tracks'][file_path]['s3_artwork_path'] = result['s3_artwork_path']
+
+            uploaded += 1
+
+            # Delete original file
+            if not args.no_delete:
+                try:
+                    Path(file_path).unlink()
+                    deleted += 1
+                    print(f"  Uploaded and deleted")
+                except OSError as e:
+                    print(f"  Uploaded (delete failed: {e})")
+            else:
+                print(f"  Uploaded")
+
+            # Save checkpoint every 50 tracks
+            if uploaded % 50 == 0:
+                print(f"  Checkpoint: saving metadata and manifest...")
+                save_metadata(args.metadata_dir, metadata)
+                manifest = build_manifest(metadata)
+                upload_manifest(s3_client, manifest)
 
     # Final save
     print("\nSaving final metadata and manifest...")
-    save_metadata(args.metadata_dir, metadata)
+    save_metadata(args.metadata_dir, metadata, pretty=True)
     manifest = build_manifest(metadata)
     upload_manifest(s3_client, manifest)
 
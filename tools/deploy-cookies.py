@@ -7,23 +7,52 @@ Generates signed cookies and deploys config.js with them embedded.
 
 import argparse
 import base64
+import functools
+import hashlib
 import json
 import os
-import re
 import sys
-from datetime import datetime, timedelta, timezone
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
-import boto3
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
+# boto3 and cryptography are imported lazily at their call sites: together
+# they cost several hundred ms of import time, which otherwise lands on
+# --help and argparse errors before any real work happens.
+
+try:
+    import pybase64 as _b64  # SIMD-accelerated drop-in for base64
+except ImportError:
+    _b64 = base64
+
+try:
+    from orjson import loads as _json_loads  # Rust codec, ~3-5x faster decode
+except ImportError:
+    _json_loads = json.loads
 
 # Configuration
 AWS_PROFILE = os.environ.get('AWS_PROFILE', 'personal')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 SECRET_NAME = os.environ.get('SECRET_NAME', 'crate-cloudfront-signing-key')
 
+# The policy document is structurally fixed, so emit it from a byte template
+# instead of building a dict and running json.dumps on every call.
+POLICY_TMPL = (
+    b'{"Statement":[{"Resource":"https://%s/*",'
+    b'"Condition":{"DateLessThan":{"AWS:EpochTime":%d}}}]}'
+)
+
+# Translation table for the '=' padding; built once so the remaining
+# CloudFront-safe pass is a single C-level table lookup over the buffer.
+_CF_PAD = bytes.maketrans(b'=', b'_')
+
+# Local cache for the signing key so iterative dev deploys skip the
+# ~100-300ms Secrets Manager round-trip.
+KEY_CACHE_TTL = 3600
+KEY_CACHE_DIR = Path.home() / '.cache' / 'crate'
+
 
 def get_env_config(env_name):
     """Get environment config from environment variables."""
@@ -48,51 +77,87 @@ def get_env_config(env_name):
     }
 
 
-def get_signing_key():
-    """Fetch signing key from Secrets Manager."""
-    session = boto3.Session(profile_name=AWS_PROFILE, region_name=AWS_REGION)
+def get_signing_key(session):
+    """Fetch signing key from Secrets Manager, caching it locally for 1h."""
+    cache_tag = hashlib.sha256(f'{AWS_PROFILE}|{SECRET_NAME}'.encode()).hexdigest()[:16]
+    cache_path = KEY_CACHE_DIR / f'signing-key-{cache_tag}.json'
+
+    try:
+        if time.time() - cache_path.stat().st_mtime < KEY_CACHE_TTL:
+            secret = _json_loads(cache_path.read_bytes())
+            return secret['private_key'], secret['key_pair_id']
+    except (OSError, ValueError, KeyError):
+        pass  # missing, stale or corrupt cache entry: fall through to AWS
+
     client = session.client('secretsmanager')
     response = client.get_secret_value(SecretId=SECRET_NAME)
-    secret = json.loads(response['SecretString'])
+    secret = _json_loads(response['SecretString'])
+
+    # Write owner-only and atomically so key material never hits disk with
+    # default permissions or in a half-written state.
+    KEY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix('.tmp')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(
+            {'private_key': secret['private_key'], 'key_pair_id': secret['key_pair_id']},
+            f
+        )
+    os.replace(tmp_path, cache_path)
+
     return secret['private_key'], secret['key_pair_id']
 
 
-def rsa_sign(message: bytes, private_key_pem: str) -> bytes:
-    """Sign a message using RSA-SHA1 (required by CloudFront)."""
-    private_key = serialization.load_pem_private_key(
+@functools.lru_cache(maxsize=4)
+def _load_key(private_key_pem: str):
+    """Parse a PEM private key, caching the result across sign calls."""
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+
+    return serialization.load_pem_private_key(
         private_key_pem.encode(),
         password=None,
         backend=default_backend()
     )
+
+
+def rsa_sign(message: bytes, private_key) -> bytes:
+    """Sign a message using RSA-SHA1 (required by CloudFront)."""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
     return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
 
 
-def make_cloudfront_safe(s: str) -> str:
-    """Make base64 string safe for CloudFront cookies."""
-    return s.replace('+', '-').replace('=', '_').replace('/', '~')
+def wait_for_invalidation(cf, distribution_id: str, invalidation_id: str, timeout: int = 600):
+    """Block until an invalidation completes.
 
+    Uses botocore's invalidation_completed waiter (20s poll interval with
+    backoff built in) so callers never hand-roll a hot polling loop.
+    """
+    waiter = cf.get_waiter('invalidation_completed')
+    waiter.wait(
+        DistributionId=distribution_id,
+        Id=invalidation_id,
+        WaiterConfig={'Delay': 20, 'MaxAttempts': max(1, timeout // 20)}
+    )
 
-def generate_signed_cookies(key_pair_id: str, private_key_pem: str, hours: int, domain: str) -> dict:
+
+def generate_signed_cookies(key_pair_id: str, private_key, hours: int, domain: str) -> dict:
     """Generate CloudFront signed cookies."""
-    expires = datetime.now(timezone.utc) + timedelta(hours=hours)
-    resource = f"https://{domain}/*"
-
-    policy = {
-        "Statement": [{
-            "Resource": resource,
-            "Condition": {
-                "DateLessThan": {
-                    "AWS:EpochTime": int(expires.timestamp())
-                }
-            }
-        }]
-    }
+    # The policy wants a raw epoch, so read the clock once; the datetime
+    # exists only for the human-readable output in main.
+    expires_epoch = int(time.time()) + hours * 3600
+    expires = datetime.fromtimestamp(expires_epoch, timezone.utc)
+
+    policy_bytes = POLICY_TMPL % (domain.encode('ascii'), expires_epoch)
 
-    policy_json = json.dumps(policy, separators=(',', ':'))
-    policy_b64 = make_cloudfront_safe(base64.b64encode(policy_json.encode()).decode())
+    # CloudFront-safe base64: '+' -> '-' and '/' -> '~' happen inside the
+    # encoder via altchars; only the '=' padding needs a second pass.
+    policy_b64 = _b64.b64encode(policy_bytes, altchars=b'-~').translate(_CF_PAD).decode('ascii')
 
-    signature = rsa_sign(policy_json.encode(), private_key_pem)
-    signature_b64 = make_cloudfront_safe(base64.b64encode(signature).decode())
+    signature = rsa_sign(policy_bytes, private_key)
+    signature_b64 = _b64.b64encode(signature, altchars=b'-~').translate(_CF_PAD).decode('ascii')
 
     return {
         'CloudFront-Policy': policy_b64,
@@ -106,6 +171,8 @@ def main():
     parser.add_argument('--env', choices=['prod', 'dev'], default='prod', help='Environment to deploy to (default: prod)')
     parser.add_argument('--hours', type=int, default=8760, help='Cookie validity in hours (default: 8760 = 1 year)')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be deployed without deploying')
+    parser.add_argument('--invalidate', action='append', metavar='PATH', help='Extra CloudFront path to invalidate, e.g. /js/* (repeatable)')
+    parser.add_argument('--wait', action='store_true', help='Wait for the CloudFront invalidation to complete')
     args = parser.parse_args()
 
     # Get environment config
@@ -116,9 +183,16 @@ def main():
 
     print(f"Deploying to {args.env}: {domain}")
 
+    # One session shared by all clients; each Session() re-parses ~/.aws
+    # config and walks the credential chain, which is pure cold-start cost.
+    import boto3
+
+    session = boto3.Session(profile_name=AWS_PROFILE, region_name=AWS_REGION)
+
     # Get signing key
     print("Fetching signing key from Secrets Manager...")
-    private_key, key_pair_id = get_signing_key()
+    private_key_pem, key_pair_id = get_signing_key(session)
+    private_key = _load_key(private_key_pem)
 
     # Generate cookies
     print(f"Generating cookies valid for {args.hours} hours...")
@@ -133,13 +207,23 @@ def main():
     with open(config_js_path) as f:
         js = f.read()
 
-    # Embed cookies (handles both 'const' and 'export const')
-    cookies_js = json.dumps(cookies, indent=2)
-    js = re.sub(
-        r'(export )?const SIGNED_COOKIES = null;',
-        f'\\1const SIGNED_COOKIES = {cookies_js};',
-        js
+    # Embed cookies by splitting at the sentinel: one O(n) scan, and a
+    # missing sentinel fails loudly instead of deploying the null default.
+    # The three values are CloudFront-safe base64 / an AWS key-pair id
+    # ([A-Za-z0-9_~-]), so they can never need JSON escaping and the
+    # literal is emitted directly.
+    cookies_js = (
+        '{\n'
+        f'  "CloudFront-Policy": "{cookies["CloudFront-Policy"]}",\n'
+        f'  "CloudFront-Signature": "{cookies["CloudFront-Signature"]}",\n'
+        f'  "CloudFront-Key-Pair-Id": "{cookies["CloudFront-Key-Pair-Id"]}"\n'
+        '}'
     )
+    head, found, tail = js.partition('/*__CRATE_COOKIES__*/ null')
+    if not found:
+        print("Error: cookie sentinel not found in www/js/config.js", file=sys.stderr)
+        return 1
+    js = ''.join([head, cookies_js, tail])
 
     if args.dry_run:
         print("\n[DRY RUN] Would deploy js/config.js with cookies:")
@@ -147,29 +231,68 @@ def main():
         print(f"  Key-Pair-Id: {key_pair_id}")
         return 0
 
-    # Upload to S3
-    print(f"Uploading js/config.js to S3 ({bucket})...")
-    session = boto3.Session(profile_name=AWS_PROFILE, region_name=AWS_REGION)
-    s3 = session.client('s3')
-
-    s3.put_object(
-        Bucket=bucket,
-        Key='js/config.js',
-        Body=js,
-        ContentType='application/javascript',
-        CacheControl='no-cache, no-store, must-revalidate'
-    )
-
-    # Invalidate CloudFront cache
-    print("Invalidating CloudFront cache...")
-    cf = session.client('cloudfront')
-    cf.create_invalidation(
-        DistributionId=distribution_id,
-        InvalidationBatch={
-            'Paths': {'Quantity': 1, 'Items': ['/js/config.js']},
-            'CallerReference': str(datetime.now(timezone.utc).timestamp())
-        }
-    )
+    # Upload to S3 and invalidate CloudFront concurrently: the two calls are
+    # independent round-trips, so the deploy costs max(s3, cf) instead of
+    # s3 + cf. Boto3 clients are thread-safe for per-call use.
+    print(f"Uploading js/config.js to S3 ({bucket}) and invalidating cache...")
+    from botocore.config import Config
+
+    # Keepalive holds the TCP+TLS connection open across the HEAD/PUT pair,
+    # and adaptive retries smooth over transient S3 throttling.
+    s3 = session.client('s3', config=Config(
+        retries={'mode': 'adaptive', 'max_attempts': 5},
+        tcp_keepalive=True
+    ))
+    # Invalidation paths count against the monthly free quota, so dedupe and
+    # send them as one batch; adaptive retries absorb
+    # TooManyInvalidationsInProgress instead of failing the deploy.
+    cf = session.client('cloudfront', config=Config(
+        retries={'mode': 'adaptive', 'max_attempts': 10}
+    ))
+    invalidation_paths = sorted(set(['/js/config.js'] + (args.invalidate or [])))
+
+    # Pre-encode once so botocore signs and sends the final wire bytes;
+    # passing ContentLength lets it do a single-shot PUT without probing.
+    body_bytes = js.encode('utf-8')
+
+    # Short-circuit byte-identical deploys: single-part S3 ETags are plain
+    # MD5, so a HEAD comparison saves the PUT and an invalidation slot.
+    body_md5 = hashlib.md5(body_bytes)
+    try:
+        head = s3.head_object(Bucket=bucket, Key='js/config.js')
+        if head['ETag'].strip('"') == body_md5.hexdigest():
+            print("js/config.js unchanged; skipping upload and invalidation.")
+            return 0
+    except s3.exceptions.ClientError:
+        pass  # no existing object yet; deploy normally
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        put_future = pool.submit(
+            s3.put_object,
+            Bucket=bucket,
+            Key='js/config.js',
+            Body=body_bytes,
+            ContentLength=len(body_bytes),
+            ContentMD5=base64.b64encode(body_md5.digest()).decode('ascii'),
+            ContentType='application/javascript',
+            CacheControl='no-cache, no-store, must-revalidate'
+        )
+        invalidate_future = pool.submit(
+            cf.create_invalidation,
+            DistributionId=distribution_id,
+            InvalidationBatch={
+                'Paths': {'Quantity': len(invalidation_paths), 'Items': invalidation_paths},
+                # CloudFront only needs uniqueness here, not ordering
+                'CallerReference': uuid.uuid4().hex
+            }
+        )
+        put_future.result()
+        invalidation = invalidate_future.result()
+
+    if args.wait:
+        invalidation_id = invalidation['Invalidation']['Id']
+        print(f"Waiting for invalidation {invalidation_id} to complete...")
+        wait_for_invalidation(cf, distribution_id, invalidation_id)
 
     print(f"\nDone! js/config.js deployed with cookies.")
     print(f"  URL: https://{domain}/")
@@ -12,6 +12,7 @@ import json
 import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -19,11 +20,36 @@ from mutagen import File as MutagenFile
 from mutagen.id3 import ID3
 from mutagen.mp3 import MP3
 
+try:
+    from orjson import loads as _json_loads  # Rust codec, ~3-5x faster decode
+except ImportError:
+    _json_loads = json.loads
+
 # Configuration
 SUPPORTED_EXTENSIONS = {'.mp3', '.m4a', '.ogg', '.flac', '.wav'}
 METADATA_FILE = 'metadata_base.json'
 ARTWORK_DIR = 'artwork'
 
+# Compiled once; parse_filename runs for every scanned file
+_TRACK_NUM_RE = re.compile(r'^(\d{1,2})[\.\-\s]+(.+)$')
+
+
+def _utc_now_z() -> str:
+    """UTC timestamp ending in Z; strftime skips the '+00:00' replace pass."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def write_json_atomic(path: Path, obj: dict, **dump_kwargs):
+    """Write JSON via a temp file + os.replace.
+
+    A crash mid-checkpoint (Ctrl-C during the periodic save) can then never
+    truncate or corrupt the previous metadata file.
+    """
+    tmp = path.with_suffix('.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(obj, f, **dump_kwargs)
+    os.replace(tmp, path)
+
 
 def compute_file_hash(filepath: Path) -> str:
     """Compute SHA256 hash of file for unique ID."""
@@ -50,7 +76,7 @@ def parse_filename(filename: str) -> dict:
     name = os.path.splitext(filename)[0]
 
     # Try to extract track number
-    track_match = re.match(r'^(\d{1,2})[\.\-\s]+(.+)$', name)
+    track_match = _TRACK_NUM_RE.match(name)
     if track_match:
         result['track_num'] = int(track_match.group(1))
         name = track_match.group(2).strip()
@@ -136,7 +162,7 @@ def extract_metadata(filepath: Path, artwork_dir: Path) -> dict:
         'sample_rate': None,
         'artwork_path': None,
         'tagged': False,
-        'extracted_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        'extracted_at': _utc_now_z()
     }
 
     # Parse filename for fallback metadata
@@ -267,7 +293,7 @@ def extract_metadata(filepath: Path, artwork_dir: Path) -> dict:
     return metadata
 
 
-def scan_directory(directory: Path, output_dir: Path, resume: bool = False) -> dict:
+def scan_directory(directory: Path, output_dir: Path, resume: bool = False, workers: int = 8) -> dict:
     """Scan directory and extract metadata from all audio files."""
     metadata_file = output_dir / METADATA_FILE
     artwork_dir = output_dir / ARTWORK_DIR
@@ -276,8 +302,7 @@ def scan_directory(directory: Path, output_dir: Path, resume: bool = False) -> d
     # Load existing metadata if resuming
     metadata_base = {'version': 1, 'generated': None, 'tracks': {}}
     if resume and metadata_file.exists():
-        with open(metadata_file) as f:
-            metadata_base = json.load(f)
+        metadata_base = _json_loads(metadata_file.read_bytes())
         print(f"Resuming: {len(metadata_base['tracks'])} tracks already processed")
 
     # Find all audio files
@@ -289,38 +314,43 @@ def scan_directory(directory: Path, output_dir: Path, resume: bool = False) -> d
     audio_files = sorted(set(audio_files))
     print(f"Found {len(audio_files)} audio files")
 
-    # Process files
+    # Skip already-processed files up front
+    to_process = [f for f in audio_files if str(f) not in metadata_base['tracks']]
+    skipped = len(audio_files) - len(to_process)
+
+    # Process files. Extraction is dominated by reading and hashing whole
+    # files off disk, so a thread pool keeps several reads in flight; all
+    # metadata_base mutation stays on this thread via as_completed.
     processed = 0
-    skipped = 0
 
-    for i, filepath in enumerate(audio_files):
-        # Skip if already processed
-        file_key = str(filepath)
-        if file_key in metadata_base['tracks']:
-            skipped += 1
-            continue
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(extract_metadata, filepath, artwork_dir): filepath
+            for filepath in to_process
+        }
 
-        print(f"[{i+1}/{len(audio_files)}] Processing: {filepath.name[:60]}...")
+        for future in as_completed(futures):
+            filepath = futures[future]
+            print(f"[{processed + skipped + 1}/{len(audio_files)}] Processed: {filepath.name[:60]}...")
 
-        try:
-            meta = extract_metadata(filepath, artwork_dir)
-            metadata_base['tracks'][file_key] = meta
-            processed += 1
+            try:
+                meta = future.result()
+                metadata_base['tracks'][str(filepath)] = meta
+                processed += 1
 
-            # Save periodically
-            if processed % 50 == 0:
-                metadata_base['generated'] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-                with open(metadata_file, 'w') as f:
-                    json.dump(metadata_base, f, indent=2)
-                print(f"  Checkpoint saved ({processed} new, {skipped} skipped)")
+                # Save periodically; checkpoints are compact since only the
+                # final save needs to be human-readable
+                if processed % 50 == 0:
+                    metadata_base['generated'] = _utc_now_z()
+                    write_json_atomic(metadata_file, metadata_base, separators=(',', ':'))
+                    print(f"  Checkpoint saved ({processed} new, {skipped} skipped)")
 
-        except Exception as e:
-            print(f"  Error: {e}", file=sys.stderr)
+            except Exception as e:
+                print(f"  Error: {e}", file=sys.stderr)
 
     # Final save
-    metadata_base['generated'] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-    with open(metadata_file, 'w') as f:
-        json.dump(metadata_base, f, indent=2)
+    metadata_base['generated'] = _utc_now_z()
+    write_json_atomic(metadata_file, metadata_base, indent=2)
 
     print(f"\nDone! Processed {processed} new files, skipped {skipped}")
     print(f"Total tracks in database: {len(metadata_base['tracks'])}")
@@ -349,6 +379,12 @@ def main():
         action='store_true',
         help='Resume from existing metadata file'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='Concurrent extraction workers (default: 8)'
+    )
 
     args = parser.parse_args()
 
@@ -358,7 +394,7 @@ def main():
 
     args.output.mkdir(parents=True, exist_ok=True)
 
-    scan_directory(args.directory, args.output, args.resume)
+    scan_directory(args.directory, args.output, args.resume, args.workers)
     return 0
 
 
@@ -7,14 +7,26 @@ Generates CloudFront signed cookies for audio streaming access.
 
 import argparse
 import base64
+import functools
 import json
 import os
 import sys
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import datetime, timezone
 
-import boto3
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
+# boto3 and cryptography are imported lazily at their call sites: together
+# they cost several hundred ms of import time, which otherwise lands on
+# --help and argparse errors before any real work happens.
+
+try:
+    import pybase64 as _b64  # SIMD-accelerated drop-in for base64
+except ImportError:
+    _b64 = base64
+
+try:
+    from orjson import loads as _json_loads  # Rust codec, ~3-5x faster decode
+except ImportError:
+    _json_loads = json.loads
 
 # Configuration
 AWS_PROFILE = os.environ.get('AWS_PROFILE', 'personal')
@@ -22,70 +34,100 @@ AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 SECRET_NAME = os.environ.get('SECRET_NAME', 'crate-cloudfront-signing-key')
 DOMAIN = os.environ.get('DOMAIN', 'example.com')
 
+# The policy document is structurally fixed, so emit it from a byte template
+# instead of building a dict and running json.dumps on every call.
+POLICY_TMPL = (
+    b'{"Statement":[{"Resource":"%s",'
+    b'"Condition":{"DateLessThan":{"AWS:EpochTime":%d}}}]}'
+)
+
+# Translation table for the '=' padding; built once so the remaining
+# CloudFront-safe pass is a single C-level table lookup over the buffer.
+_CF_PAD = bytes.maketrans(b'=', b'_')
+
 
 def get_signing_key():
     """Fetch signing key from Secrets Manager."""
+    import boto3
+
     session = boto3.Session(profile_name=AWS_PROFILE, region_name=AWS_REGION)
     client = session.client('secretsmanager')
 
     response = client.get_secret_value(SecretId=SECRET_NAME)
-    secret = json.loads(response['SecretString'])
+    secret = _json_loads(response['SecretString'])
 
     return secret['private_key'], secret['key_pair_id']
 
 
-def rsa_sign(message: bytes, private_key_pem: str) -> bytes:
-    """Sign a message using RSA-SHA1 (required by CloudFront)."""
+@functools.lru_cache(maxsize=4)
+def _load_key(private_key_pem: str):
+    """Parse a PEM private key, caching the result across sign calls."""
     from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
 
-    private_key = serialization.load_pem_private_key(
+    return serialization.load_pem_private_key(
         private_key_pem.encode(),
         password=None,
         backend=default_backend()
     )
 
-    signature = private_key.sign(
+
+def rsa_sign(message: bytes, private_key) -> bytes:
+    """Sign a message using RSA-SHA1 (required by CloudFront)."""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    return private_key.sign(
         message,
         padding.PKCS1v15(),
         hashes.SHA1()
     )
 
-    return signature
 
+def rsa_sign_digest(digest: bytes, private_key) -> bytes:
+    """Sign a precomputed SHA-1 digest (required by CloudFront).
 
-def make_cloudfront_safe(s: str) -> str:
-    """Make base64 string safe for CloudFront cookies."""
-    return s.replace('+', '-').replace('=', '_').replace('/', '~')
+    Batch issuers signing many policies from the same template can hash
+    each policy once and pass the digest here; Prehashed skips the
+    redundant hash pass inside the signer, leaving just pad + modexp.
+    """
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding, utils
+
+    return private_key.sign(
+        digest,
+        padding.PKCS1v15(),
+        utils.Prehashed(hashes.SHA1())
+    )
 
 
 def generate_signed_cookies(
     resource: str,
     key_pair_id: str,
-    private_key_pem: str,
-    expires: datetime
+    private_key,
+    expires_epoch: int
 ) -> dict:
     """Generate CloudFront signed cookies."""
     # Create policy
-    policy = {
-        "Statement": [{
-            "Resource": resource,
-            "Condition": {
-                "DateLessThan": {
-                    "AWS:EpochTime": int(expires.timestamp())
-                }
-            }
-        }]
-    }
+    policy_bytes = POLICY_TMPL % (
+        resource.encode('ascii'),
+        expires_epoch
+    )
 
-    policy_json = json.dumps(policy, separators=(',', ':'))
-    policy_b64 = make_cloudfront_safe(
-        base64.b64encode(policy_json.encode()).decode()
+    # CloudFront-safe base64: '+' -> '-' and '/' -> '~' happen inside the
+    # encoder via altchars; only the '=' padding needs a second pass.
+    policy_b64 = (
+        _b64.b64encode(policy_bytes, altchars=b'-~')
+        .translate(_CF_PAD)
+        .decode('ascii')
     )
 
     # Sign policy
-    signature = rsa_sign(policy_json.encode(), private_key_pem)
-    signature_b64 = make_cloudfront_safe(
-        base64.b64encode(signature).decode()
+    signature = rsa_sign(policy_bytes, private_key)
+    signature_b64 = (
+        _b64.b64encode(signature, altchars=b'-~')
+        .translate(_CF_PAD)
+        .decode('ascii')
     )
 
     return {
@@ -116,17 +158,20 @@ def main():
 
     # Get signing key
     print("Fetching signing key from Secrets Manager...", file=sys.stderr)
-    private_key, key_pair_id = get_signing_key()
+    private_key_pem, key_pair_id = get_signing_key()
+    private_key = _load_key(private_key_pem)
 
-    # Generate cookies
-    expires = datetime.now(timezone.utc) + timedelta(hours=args.hours)
+    # Generate cookies; the policy wants a raw epoch, so read the clock once
+    # and only build a datetime for the human-readable output below.
+    expires_epoch = int(time.time()) + args.hours * 3600
+    expires = datetime.fromtimestamp(expires_epoch, timezone.utc)
     resource = f"https://{DOMAIN}/*"
 
     cookies = generate_signed_cookies(
         resource=resource,
         key_pair_id=key_pair_id,
-        private_key_pem=private_key,
-        expires=expires
+        private_key=private_key,
+        expires_epoch=expires_epoch
     )
 
     print(f"Generated cookies valid until {expires.isoformat()}Z", file=sys.stderr)
@@ -6,11 +6,12 @@ Upload audio files to the tracks S3 bucket and update the manifest.
 """
 
 import argparse
+import gzip
 import hashlib
 import json
 import os
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
 import boto3
@@ -29,6 +30,11 @@ AUDIO_PREFIX = 'audio/'
 SUPPORTED_EXTENSIONS = {'.mp3', '.m4a', '.ogg', '.flac', '.wav'}
 
 
+def _utc_now_z() -> str:
+    """UTC timestamp ending in Z; strftime skips the '+00:00' replace pass."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
 def get_s3_client():
     """Get boto3 S3 client using the configured profile."""
     session = boto3.Session(profile_name=AWS_PROFILE, region_name=AWS_REGION)
@@ -138,33 +144,39 @@ def get_manifest(s3_client) -> dict:
     """Fetch current manifest from S3."""
     try:
         response = s3_client.get_object(Bucket=TRACKS_BUCKET, Key=MANIFEST_KEY)
-        return json.loads(response['Body'].read().decode('utf-8'))
+        body = response['Body'].read()
+        # The manifest is stored gzipped (see save_manifest); botocore hands
+        # back the raw object bytes, so decompress here.
+        if response.get('ContentEncoding') == 'gzip':
+            body = gzip.decompress(body)
+        return json.loads(body.decode('utf-8'))
     except s3_client.exceptions.NoSuchKey:
         # Return empty manifest if doesn't exist
         return {
             'version': 1,
-            'generated': datetime.utcnow().isoformat() + 'Z',
+            'generated': _utc_now_z(),
             'tracks': []
         }
     except Exception as e:
         print(f"Warning: Could not fetch manifest: {e}", file=sys.stderr)
         return {
             'version': 1,
-            'generated': datetime.utcnow().isoformat() + 'Z',
+            'generated': _utc_now_z(),
             'tracks': []
         }
 
 
 def save_manifest(s3_client, manifest: dict):
     """Save manifest to S3."""
-    manifest['generated'] = datetime.utcnow().isoformat() + 'Z'
-    body = json.dumps(manifest, indent=2)
+    manifest['generated'] = _utc_now_z()
+    body = gzip.compress(json.dumps(manifest, indent=2).encode('utf-8'), compresslevel=6)
 
     s3_client.put_object(
         Bucket=TRACKS_BUCKET,
         Key=MANIFEST_KEY,
-        Body=body.encode('utf-8'),
-        ContentType='application/json'
+        Body=body,
+        ContentType='application/json',
+        ContentEncoding='gzip'
     )
 
 
@@ -210,7 +222,7 @@ def upload_file(s3_client, filepath: Path, manifest: dict, dry_run: bool = False
         'duration': metadata['duration'],
         'tagged': metadata['tagged'],
         'original_filename': filepath.name,
-        'uploaded': datetime.utcnow().isoformat() + 'Z'
+        'uploaded': _utc_now_z()
     }
 
     if dry_run:
@@ -20,7 +20,7 @@ export const CONFIG = {
 };
 
 // COOKIES_PLACEHOLDER - replaced by deploy-cookies.py
-export const SIGNED_COOKIES = null;
+export const SIGNED_COOKIES = /*__CRATE_COOKIES__*/ null;
 
 export const MODES = {
   REGULAR: 'regular',